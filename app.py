@@ -2,12 +2,23 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import os
+import re
+import ast
 from git import Repo
 import traceback
 
 # Constants
 FILE_NAME = "clients.csv"
 REPO_PATH = os.path.dirname(os.path.abspath(__file__))
+CLIENT_COLUMNS = ['client_name', 'email', 'sessions_completed', 'sessions_remaining',
+                  'total_sessions', 'booked_sessions']
+SESSION_FORMAT = '%Y-%m-%d %H:%M'
+LEGACY_SESSION_FORMAT = '%Y-%m-%d'
+BOOKING_HOURS = range(9, 18)  # 9 AM to 5 PM
+SCHEMA_CURRENT = 'current'
+SCHEMA_LEGACY = 'legacy'
+IMPORT_CHUNK_SIZE = 500
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
 
 # Initialize session state variables
 if 'current_view' not in st.session_state:
@@ -20,6 +31,14 @@ if 'authenticated_client' not in st.session_state:
     st.session_state.authenticated_client = None
 if 'is_trainer' not in st.session_state:
     st.session_state.is_trainer = False
+if 'calendar_mode' not in st.session_state:
+    st.session_state.calendar_mode = 'Week'
+if 'clients_loaded' not in st.session_state:
+    st.session_state.clients_loaded = False
+if 'data_version' not in st.session_state:
+    st.session_state.data_version = 0
+if 'calendar_cache' not in st.session_state:
+    st.session_state.calendar_cache = {}
 
 def sync_with_github(commit_message="Updated client data"):
     """Function to sync changes with GitHub"""
@@ -53,6 +72,8 @@ def sync_with_github(commit_message="Updated client data"):
 
 def save_clients_to_csv(clients, file_name=FILE_NAME):
     """Function to save client data to CSV"""
+    # Invalidate cached calendar views built from the previous data
+    st.session_state.data_version += 1
     try:
         clients_copy = {}
         for name, data in clients.items():
@@ -63,9 +84,7 @@ def save_clients_to_csv(clients, file_name=FILE_NAME):
         df.reset_index(inplace=True)
         df.rename(columns={'index': 'client_name'}, inplace=True)
         
-        columns = ['client_name', 'email', 'sessions_completed', 'sessions_remaining', 
-                  'total_sessions', 'booked_sessions']
-        df = df[columns]
+        df = df[CLIENT_COLUMNS]
         
         df.to_csv(file_name, index=False)
         st.success("Changes saved successfully!")
@@ -81,11 +100,11 @@ def load_clients_from_csv(file_name=FILE_NAME):
             df = pd.read_csv(file_name, dtype=str)
             clients_dict = {}
             
-            required_columns = ['client_name', 'email', 'sessions_completed', 
-                              'sessions_remaining', 'total_sessions', 'booked_sessions']
-            
-            if not all(col in df.columns for col in required_columns):
-                st.error(f"Missing required columns. Found columns: {df.columns.tolist()}")
+            if not all(col in df.columns for col in CLIENT_COLUMNS):
+                if _is_legacy_header(df.columns):
+                    st.error("This roster uses the legacy format. Use 'Import Clients from CSV' in the Clients view to convert it.")
+                else:
+                    st.error(f"Missing required columns. Found columns: {df.columns.tolist()}")
                 return {}
             
             for _, row in df.iterrows():
@@ -98,8 +117,8 @@ def load_clients_from_csv(file_name=FILE_NAME):
                 total_sessions = int(float(row['total_sessions'])) if pd.notna(row['total_sessions']) else 0
                 
                 try:
-                    booked_sessions = eval(row['booked_sessions']) if pd.notna(row['booked_sessions']) and row['booked_sessions'].strip() not in ('[]', '') else []
-                except:
+                    booked_sessions = parse_booked_sessions(row['booked_sessions']) if pd.notna(row['booked_sessions']) else []
+                except ValueError:
                     booked_sessions = []
                 
                 clients_dict[client_name] = {
@@ -114,10 +133,311 @@ def load_clients_from_csv(file_name=FILE_NAME):
         st.error(f"Error loading CSV: {str(e)}")
     return {}
 
-def display_calendar_view():
-    """Display the calendar view for the trainer"""
-    st.header("Session Calendar")
+def _is_legacy_header(columns):
+    """Check whether CSV columns match the legacy index-column layout"""
+    columns = [str(col).strip() for col in columns]
+    return (bool(columns) and 'client_name' not in columns
+            and (columns[0] == '' or columns[0].startswith('Unnamed')))
+
+def _rewind(source):
+    """Reset a file-like source so it can be read again"""
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+def detect_schema_version(source):
+    """Detect whether a roster CSV uses the current or the legacy layout"""
+    header = pd.read_csv(source, nrows=0, dtype=str)
+    _rewind(source)
+    
+    if 'client_name' in header.columns:
+        return SCHEMA_CURRENT
+    if _is_legacy_header(header.columns):
+        return SCHEMA_LEGACY
+    raise ValueError(f"Unrecognized roster format. Found columns: {header.columns.tolist()}")
+
+def _count_data_lines(source):
+    """Count lines after the header, an upper bound on the number of records"""
+    line_count = 0
+    last_block = b''
+    for block in iter(lambda: source.read(1 << 20), b''):
+        line_count += block.count(b'\n')
+        last_block = block
+    _rewind(source)
+    
+    # The last line may not end with a newline
+    if last_block and not last_block.endswith(b'\n'):
+        line_count += 1
+    return max(line_count - 1, 0)
+
+def _parse_session(value):
+    """Parse a booked session, returning (datetime, whether it had a time)"""
+    value = str(value).strip()
+    try:
+        return datetime.strptime(value, SESSION_FORMAT), True
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, LEGACY_SESSION_FORMAT), False
+    except ValueError:
+        raise ValueError(f"Invalid session date '{value}'")
+
+def index_bookings_by_day(clients):
+    """Index booked sessions by date as sorted (datetime, client name) pairs"""
+    bookings_by_day = {}
+    for client_name, client_data in clients.items():
+        for session in client_data['booked_sessions']:
+            try:
+                session_datetime = datetime.strptime(session, SESSION_FORMAT)
+            except ValueError:
+                continue
+            bookings_by_day.setdefault(session_datetime.date(), []).append((session_datetime, client_name))
+    for sessions in bookings_by_day.values():
+        sessions.sort()
+    return bookings_by_day
+
+def _slot_is_free(slot, bookings_by_day, scheduled=()):
+    """Check that a slot is at least an hour away from every other booking"""
+    nearby = list(scheduled) + [booked for offset in (-1, 0, 1)
+                                for booked, _ in bookings_by_day.get(slot.date() + timedelta(days=offset), [])]
+    return all(abs((slot - booked).total_seconds()) >= 3600 for booked in nearby)
+
+def parse_booked_sessions(raw):
+    """Safely parse a stored list of booked sessions"""
+    raw = raw.strip()
+    if raw in ('', '[]'):
+        return []
+    
+    try:
+        sessions = ast.literal_eval(raw)
+    except (ValueError, TypeError, SyntaxError, RecursionError, MemoryError):
+        raise ValueError(f"Invalid booked sessions '{raw}'")
+    if isinstance(sessions, str):
+        sessions = [sessions]
+    if not isinstance(sessions, (list, tuple)):
+        raise ValueError(f"Invalid booked sessions '{raw}'")
+    
+    # Drop duplicate bookings while keeping their original order
+    return list(dict.fromkeys(str(session).strip() for session in sessions))
+
+def schedule_booked_sessions(sessions, bookings_by_day):
+    """Normalize sessions to '%Y-%m-%d %H:%M' without overlapping other bookings
+    
+    Timed sessions are reserved first, then date-only legacy sessions are given
+    the first free booking hour of their day. Returns a tuple of (scheduled
+    datetimes, messages for sessions that were left out).
+    """
+    timed_sessions = []
+    date_only_sessions = []
+    dropped = []
+    for session in sessions:
+        try:
+            session_datetime, has_time = _parse_session(session)
+        except ValueError as e:
+            dropped.append(str(e))
+            continue
+        if has_time:
+            timed_sessions.append(session_datetime)
+        else:
+            date_only_sessions.append(session_datetime)
+    
+    scheduled = []
+    for session_datetime in timed_sessions:
+        if _slot_is_free(session_datetime, bookings_by_day, scheduled):
+            scheduled.append(session_datetime)
+        else:
+            dropped.append(f"Session {session_datetime.strftime(SESSION_FORMAT)} overlaps another booking")
+    
+    for session_date in date_only_sessions:
+        for hour in BOOKING_HOURS:
+            slot = session_date.replace(hour=hour)
+            if _slot_is_free(slot, bookings_by_day, scheduled):
+                scheduled.append(slot)
+                break
+        else:
+            dropped.append(f"No free booking slot on {session_date.strftime(LEGACY_SESSION_FORMAT)}")
+    
+    return sorted(scheduled), dropped
+
+def _parse_session_count(raw, field):
+    """Parse a non-negative session count, treating blanks as zero"""
+    raw = raw.strip()
+    if not raw:
+        return 0
+    try:
+        count = int(float(raw))
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid {field} '{raw}'")
+    if count < 0:
+        raise ValueError(f"Invalid {field} '{raw}'")
+    return count
+
+def _normalize_roster_row(row):
+    """Convert one roster CSV row into the current client record format"""
+    email = row['email'].strip()
+    if email and not EMAIL_PATTERN.match(email):
+        raise ValueError(f"Invalid email '{email}'")
+    
+    return {
+        'email': email,
+        'sessions_completed': _parse_session_count(row['sessions_completed'], 'sessions_completed'),
+        'sessions_remaining': _parse_session_count(row['sessions_remaining'], 'sessions_remaining'),
+        'total_sessions': _parse_session_count(row['total_sessions'], 'total_sessions'),
+        'booked_sessions': parse_booked_sessions(row['booked_sessions'])
+    }
+
+def import_clients_from_csv(source, existing_clients, chunk_size=IMPORT_CHUNK_SIZE, progress_callback=None):
+    """Read a client roster CSV in chunks and convert it to the current format
+    
+    Returns a tuple of (imported clients, report rows). Records that fail validation
+    or reuse an existing client name or email are skipped. Clients without an email,
+    or with sessions that clash with another booking, are imported with a warning
+    and without those sessions. Report rows refer to data records, which may differ
+    from file line numbers.
+    
+    Only parsing is chunked: imported clients are kept until the end because the
+    roster is stored as a single CSV that is rewritten on every save.
+    """
+    if not hasattr(source, 'read'):
+        with open(source, 'rb') as f:
+            return import_clients_from_csv(f, existing_clients, chunk_size, progress_callback)
+    
+    schema = detect_schema_version(source)
+    total_records = max(_count_data_lines(source), 1)
+    seen_emails = {data['email'].lower() for data in existing_clients.values() if data['email']}
+    bookings_by_day = index_bookings_by_day(existing_clients)
+    imported_clients = {}
+    report = []
+    records_processed = 0
+    
+    for chunk in pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        if schema == SCHEMA_LEGACY:
+            chunk = chunk.rename(columns={chunk.columns[0]: 'client_name'})
+        missing_columns = [col for col in CLIENT_COLUMNS if col not in chunk.columns]
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        for row in chunk.to_dict(orient='records'):
+            records_processed += 1
+            client_name = row['client_name'].strip()
+            try:
+                if not client_name:
+                    raise ValueError("Missing client name")
+                if client_name in existing_clients or client_name in imported_clients:
+                    raise ValueError(f"Client {client_name} already exists")
+                client_data = _normalize_roster_row(row)
+                if client_data['email'].lower() in seen_emails:
+                    raise ValueError(f"Duplicate email '{client_data['email']}'")
+            except Exception as e:
+                report.append({'record': records_processed, 'client_name': client_name,
+                               'status': 'skipped', 'message': str(e)})
+                continue
+            
+            if client_data['email']:
+                seen_emails.add(client_data['email'].lower())
+            else:
+                report.append({'record': records_processed, 'client_name': client_name,
+                               'status': 'warning', 'message': "Imported without an email; client cannot log in"})
+            
+            scheduled, dropped = schedule_booked_sessions(client_data['booked_sessions'], bookings_by_day)
+            for message in dropped:
+                report.append({'record': records_processed, 'client_name': client_name,
+                               'status': 'warning', 'message': f"{message}; session not imported"})
+            for session_datetime in scheduled:
+                bookings_by_day.setdefault(session_datetime.date(), []).append((session_datetime, client_name))
+            client_data['booked_sessions'] = [session_datetime.strftime(SESSION_FORMAT)
+                                              for session_datetime in scheduled]
+            imported_clients[client_name] = client_data
+        
+        if progress_callback:
+            # Blank lines and multi-line fields make the line count an upper bound
+            progress_callback(records_processed, min(records_processed / total_records, 1.0))
+    
+    return imported_clients, report
+
+def display_client_import():
+    """Display the roster import form for the trainer"""
+    with st.expander("Import Clients from CSV"):
+        uploaded_file = st.file_uploader("Client roster (current or legacy format)", type="csv")
+        
+        if uploaded_file is not None and st.button("Import Clients"):
+            progress_bar = st.progress(0.0, text="Importing clients...")
+            
+            def report_progress(records_processed, fraction_done):
+                progress_bar.progress(fraction_done, text=f"Processed {records_processed} records")
+            
+            try:
+                imported_clients, report = import_clients_from_csv(
+                    uploaded_file, st.session_state.clients, progress_callback=report_progress)
+            except Exception as e:
+                st.error(f"Error importing roster: {str(e)}")
+                return
+            progress_bar.progress(1.0, text="Import complete")
+            
+            # Write all imported clients in a single save
+            if imported_clients:
+                st.session_state.clients.update(imported_clients)
+                save_clients_to_csv(st.session_state.clients)
+            skipped = sum(1 for entry in report if entry['status'] == 'skipped')
+            st.info(f"Imported {len(imported_clients)} clients, skipped {skipped} records")
+            
+            if report:
+                import_report = pd.DataFrame(report, columns=['record', 'client_name', 'status', 'message'])
+                st.dataframe(import_report)
+                st.download_button(
+                    "Download Import Report",
+                    import_report.to_csv(index=False),
+                    "import_report.csv",
+                    "text/csv",
+                    key='download-import-report'
+                )
+
+def _get_cached_view(key, build):
+    """Return a calendar view from the cache, building it on a miss"""
+    cache = st.session_state.calendar_cache
+    version = st.session_state.data_version
+    cache_key = key + (version,)
+    
+    if cache_key not in cache:
+        # Drop views built from older client data
+        for stale_key in [k for k in cache if k[-1] != version]:
+            del cache[stale_key]
+        cache[cache_key] = build()
+    return cache[cache_key]
+
+def _prune_calendar_cache(views):
+    """Drop cached week and month views other than the given (kind, start) keys"""
+    cache = st.session_state.calendar_cache
+    for key in [k for k in cache if k[0] != 'bookings' and k[:-1] not in views]:
+        del cache[key]
+
+def get_bookings_by_day():
+    """Index all booked sessions by date in a single pass over the bookings"""
+    return _get_cached_view(('bookings',), lambda: index_bookings_by_day(st.session_state.clients))
+
+def get_week_view(start_of_week):
+    """Return the (day, sessions) pairs for the week starting on start_of_week"""
+    def build():
+        bookings_by_day = get_bookings_by_day()
+        week_days = [start_of_week + timedelta(days=i) for i in range(7)]
+        return [(day, bookings_by_day.get(day, [])) for day in week_days]
+    
+    return _get_cached_view(('week', start_of_week), build)
+
+def get_month_view(first_of_month):
+    """Return the per-day booking counts for the month starting on first_of_month"""
+    def build():
+        bookings_by_day = get_bookings_by_day()
+        day_counts = {}
+        day = first_of_month
+        while day.month == first_of_month.month:
+            day_counts[day] = len(bookings_by_day.get(day, []))
+            day += timedelta(days=1)
+        return day_counts
     
+    return _get_cached_view(('month', first_of_month), build)
+
+def display_week_view():
+    """Display the weekly session grid"""
     # Calendar navigation
     col1, col2, col3 = st.columns([1, 2, 1])
     with col1:
@@ -130,26 +450,90 @@ def display_calendar_view():
             st.session_state.selected_date += timedelta(days=7)
     
     # Get the start of the week
-    start_of_week = st.session_state.selected_date - timedelta(days=st.session_state.selected_date.weekday())
+    selected_day = st.session_state.selected_date.date()
+    start_of_week = selected_day - timedelta(days=selected_day.weekday())
+    previous_week = start_of_week - timedelta(days=7)
+    next_week = start_of_week + timedelta(days=7)
     
-    # Create weekly calendar
-    week_days = []
-    for i in range(7):
-        current_date = start_of_week + timedelta(days=i)
-        week_days.append(current_date)
+    # Keep only this week and its neighbours cached
+    _prune_calendar_cache({('week', previous_week), ('week', start_of_week), ('week', next_week)})
     
     # Display calendar grid
     cols = st.columns(7)
-    for i, day in enumerate(week_days):
+    for i, (day, sessions) in enumerate(get_week_view(start_of_week)):
         with cols[i]:
             st.write(f"**{day.strftime('%a %b %d')}**")
             
             # Display booked sessions for this day
-            for client_name, client_data in st.session_state.clients.items():
-                for session in client_data['booked_sessions']:
-                    session_datetime = datetime.strptime(session, '%Y-%m-%d %H:%M')
-                    if session_datetime.date() == day.date():
-                        st.info(f"{session_datetime.strftime('%I:%M %p')}\n{client_name}")
+            for session_datetime, client_name in sessions:
+                st.info(f"{session_datetime.strftime('%I:%M %p')}\n{client_name}")
+    
+    # Precompute adjacent weeks after rendering so navigation hits the cache
+    get_week_view(previous_week)
+    get_week_view(next_week)
+
+def display_month_view():
+    """Display the monthly overview of booking counts"""
+    selected_day = st.session_state.selected_date.date()
+    first_of_month = selected_day.replace(day=1)
+    
+    # Calendar navigation
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("← Previous Month"):
+            st.session_state.selected_date = datetime.combine(
+                first_of_month - timedelta(days=1), datetime.min.time()).replace(day=1)
+    with col2:
+        month_label = st.empty()
+    with col3:
+        if st.button("Next Month →"):
+            st.session_state.selected_date = datetime.combine(
+                first_of_month + timedelta(days=32), datetime.min.time()).replace(day=1)
+    
+    first_of_month = st.session_state.selected_date.date().replace(day=1)
+    month_label.write(first_of_month.strftime('%B %Y'))
+    previous_month = (first_of_month - timedelta(days=1)).replace(day=1)
+    next_month = (first_of_month + timedelta(days=32)).replace(day=1)
+    
+    # Keep only this month and its neighbours cached
+    _prune_calendar_cache({('month', previous_month), ('month', first_of_month), ('month', next_month)})
+    day_counts = get_month_view(first_of_month)
+    
+    # Weekday headers
+    cols = st.columns(7)
+    for i, weekday in enumerate(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']):
+        with cols[i]:
+            st.write(f"**{weekday}**")
+    
+    # Pad the first week so days line up under their weekday
+    days = [None] * first_of_month.weekday() + list(day_counts.keys())
+    for week_start in range(0, len(days), 7):
+        cols = st.columns(7)
+        for i, day in enumerate(days[week_start:week_start + 7]):
+            if day is None:
+                continue
+            with cols[i]:
+                count = day_counts[day]
+                if count:
+                    st.info(f"{day.day}\n{count} booked")
+                else:
+                    st.write(f"{day.day}")
+    
+    st.metric("Sessions This Month", sum(day_counts.values()))
+    
+    # Precompute adjacent months after rendering so navigation hits the cache
+    get_month_view(previous_month)
+    get_month_view(next_month)
+
+def display_calendar_view():
+    """Display the calendar view for the trainer"""
+    st.header("Session Calendar")
+    
+    st.radio("View", ['Week', 'Month'], key='calendar_mode', horizontal=True)
+    if st.session_state.calendar_mode == 'Week':
+        display_week_view()
+    else:
+        display_month_view()
 
 def display_client_management():
     """Display the client management interface"""
@@ -179,6 +563,9 @@ def display_client_management():
             else:
                 st.error("Please provide both name and email")
 
+    # Import clients from an existing roster
+    display_client_import()
+
     # Manage existing clients
     st.subheader("Manage Existing Clients")
     for client_name, data in st.session_state.clients.items():
@@ -316,24 +703,13 @@ def display_client_booking():
             
             # Time selection
             available_times = []
-            for hour in range(9, 18):  # 9 AM to 5 PM
+            bookings_by_day = get_bookings_by_day()
+            for hour in BOOKING_HOURS:
                 time_slot = f"{hour:02d}:00"
                 
                 # Check if slot is available
                 slot_datetime = datetime.combine(selected_date, datetime.strptime(time_slot, '%H:%M').time())
-                slot_is_available = True
-                
-                for _, data in st.session_state.clients.items():
-                    for session in data['booked_sessions']:
-                        try:
-                            booked_datetime = datetime.strptime(session, '%Y-%m-%d %H:%M')
-                            if abs((slot_datetime - booked_datetime).total_seconds()) < 3600:
-                                slot_is_available = False
-                                break
-                        except ValueError:
-                            continue
-                
-                if slot_is_available:
+                if _slot_is_free(slot_datetime, bookings_by_day):
                     available_times.append(time_slot)
             
             if available_times:
@@ -389,8 +765,10 @@ def main():
     st.set_page_config(page_title="Fitness Training App", page_icon="💪")
     
     # Load client data
-    if not st.session_state.clients:
+    if not st.session_state.clients_loaded:
         st.session_state.clients = load_clients_from_csv()
+        st.session_state.clients_loaded = True
+        st.session_state.data_version += 1
     
     # Navigation
     st.sidebar.title("Navigation")